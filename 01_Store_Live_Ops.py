@@ -3,15 +3,13 @@ import streamlit as st
 import pandas as pd
 
 from shop_mapping import SHOP_NAME_MAP
+from kpi_store import get_report_frame
 from utils_pfmx import (
     inject_css,
     api_get_live_inside,
-    api_get_report,
-    normalize_vemcount_daylevel,
     fmt_eur,
     fmt_pct,
     friendly_error,
-    build_params_reports_plain,   # <-- plain keys (data, data_output)
 )
 
 st.set_page_config(page_title="Store Live Ops", page_icon="🟢", layout="wide")
@@ -53,32 +51,29 @@ c1.metric("👥 Nu binnen", int(inside))
 c2.markdown("&nbsp;", unsafe_allow_html=True)
 
 # ---------------------------
-# Dag & Week KPI's (plain keys)
+# Dag & Week KPI's (gedeelde KPI-store)
 # ---------------------------
 st.markdown("#### Dag & Week KPI's")
 outputs = ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]
 
-# Yesterday
-params_y = build_params_reports_plain("shops", "yesterday", [shop_id], outputs)
-js_y = api_get_report(params_y)
-y_error = friendly_error(js_y, "yesterday")
-
-# This week
-params_tw = build_params_reports_plain("shops", "this_week", [shop_id], outputs)
-js_tw = api_get_report(params_tw)
-tw_error = friendly_error(js_tw, "this_week")
-
-# Last week
-params_lw = build_params_reports_plain("shops", "last_week", [shop_id], outputs)
-js_lw = api_get_report(params_lw)
-lw_error = friendly_error(js_lw, "last_week")
+def _kpi_frame(period: str) -> pd.DataFrame:
+    # Read-only view op de gedeelde store; alleen lezen/aggregeren, niet in-place wijzigen
+    # Foutpayloads (HTTP 200 met error-body) komen hier als ValueError binnen
+    try:
+        df = get_report_frame("shops", period, [shop_id], outputs)
+    except Exception as e:
+        st.warning(f"Kon {period} niet ophalen: {e}")
+        return pd.DataFrame(columns=outputs)
+    if df.empty:
+        st.info(f"Geen data voor {period}.")
+    return df
 
 # ---------------------------
 # KPIs renderen met fallbacks
 # ---------------------------
-df_y  = normalize_vemcount_daylevel(js_y)  if not y_error  else pd.DataFrame(columns=["conversion_rate"])
-df_tw = normalize_vemcount_daylevel(js_tw) if not tw_error else pd.DataFrame(columns=["count_in"])
-df_lw = normalize_vemcount_daylevel(js_lw) if not lw_error else pd.DataFrame(columns=["count_in"])
+df_y  = _kpi_frame("yesterday")
+df_tw = _kpi_frame("this_week")
+df_lw = _kpi_frame("last_week")
 
 conv_y = float(df_y["conversion_rate"].mean()) if not df_y.empty else 0.0
 vis_tw = int(df_tw["count_in"].sum()) if not df_tw.empty else 0
@@ -1,6 +1,11 @@
 # Home.py — robust import of utils_pfmx
 import streamlit as st
 
+# Start (eenmalig per serverproces) het ochtendelijke opwarmen van de KPI-store.
+# Vóór de utils-import, zodat een ontbrekende helper de scheduler niet tegenhoudt.
+from cache_warmer import start_cache_warmer
+start_cache_warmer()
+
 try:
     from utils_pfmx import inject_css
 except Exception as e:
@@ -0,0 +1,193 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Tuple, Dict, Any, Callable
+
+import streamlit as st
+
+from shop_mapping import SHOP_NAME_MAP
+from kpi_store import KPIStore, OPEN_PERIODS, get_kpi_store, slice_key, fetch_report_frame
+
+# Dezelfde aanroepen als Store Live Ops doet (per winkel), zodat de keys in de store overeenkomen.
+# Region Radar volgt zodra die pagina via get_report_frame leest.
+WARM_OUTPUTS = ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]
+STORE_LIVE_OPS_PERIODS = ["yesterday", "this_week", "last_week"]
+
+_DEFAULT_WARM_AT = "06:30"
+_DEFAULT_REFRESH_UNTIL = "11:00"
+_DEFAULT_CONCURRENCY = 3
+_DEFAULT_SPREAD_S = 2.0
+_MIN_REFRESH_S = 60.0
+
+_active: Optional["CacheWarmer"] = None
+_active_lock = threading.Lock()
+
+def warm_targets(shop_ids: List[int]) -> List[Tuple[str, List[int]]]:
+    """(period, shop_ids) per Store Live Ops request: each shop alone."""
+    return [(period, [sid]) for period in STORE_LIVE_OPS_PERIODS for sid in shop_ids]
+
+def _parse_hhmm(value: str) -> Tuple[int, int]:
+    try:
+        hh, mm = (int(x) for x in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"Ongeldige tijd {value!r}, verwacht HH:MM") from None
+    if not (0 <= hh < 24 and 0 <= mm < 60):
+        raise ValueError(f"Ongeldige tijd {value!r}, verwacht HH:MM")
+    return hh, mm
+
+def _at(now: datetime, hhmm: str) -> datetime:
+    hh, mm = _parse_hhmm(hhmm)
+    return now.replace(hour=hh, minute=mm, second=0, microsecond=0)
+
+def _next_run(now: datetime, warm_at: str) -> datetime:
+    run = _at(now, warm_at)
+    return run if run > now else run + timedelta(days=1)
+
+class CacheWarmer:
+    """
+    Daily background warm-up of the shared KPI store. Fetches run on a
+    small thread pool (concurrency cap) with a random start offset per
+    fetch so the backend is not hit in one burst. Between warm_at and
+    refresh_until, periods that include today are re-fetched before their
+    TTL in the store runs out, so they stay servable through the morning.
+    """
+
+    def __init__(
+        self,
+        store_factory: Callable[[], KPIStore],
+        shop_ids: List[int],
+        warm_at: str = _DEFAULT_WARM_AT,
+        refresh_until: str = _DEFAULT_REFRESH_UNTIL,
+        concurrency: int = _DEFAULT_CONCURRENCY,
+        spread_s: float = _DEFAULT_SPREAD_S,
+    ):
+        _parse_hhmm(warm_at)
+        _parse_hhmm(refresh_until)
+        # Store per run opnieuw opvragen: na "Clear cache" is er een nieuwe store
+        self.store_factory = store_factory
+        self.shop_ids = list(shop_ids)
+        self.warm_at = warm_at
+        self.refresh_until = refresh_until
+        self.concurrency = max(1, int(concurrency))
+        self.spread_s = max(0.0, float(spread_s))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_full: Optional[date] = None
+        self._last_run: Optional[datetime] = None
+        self.coverage: Dict[str, Any] = {}
+
+    def _warm_one(self, store: KPIStore, period: str, ids: List[int]) -> None:
+        if self.spread_s:
+            time.sleep(random.uniform(0, self.spread_s))
+        df = fetch_report_frame("shops", period, ids, WARM_OUTPUTS)
+        if df.empty:
+            # Foutpayload of geen data; telt niet als opgewarmd
+            raise ValueError("lege response")
+        store.put(slice_key("shops", period, ids, WARM_OUTPUTS), df)
+
+    def warm_now(self, open_only: bool = False) -> Dict[str, Any]:
+        store = self.store_factory()
+        targets = [t for t in warm_targets(self.shop_ids) if not open_only or t[0] in OPEN_PERIODS]
+        started = datetime.now()
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self._warm_one, store, p, ids): (p, ids) for p, ids in targets}
+            for fut in as_completed(futures):
+                try:
+                    fut.result()
+                except Exception as e:
+                    period, ids = futures[fut]
+                    failed.append({"period": period, "shop_ids": ids, "error": str(e)})
+        self._last_run = started
+        if not open_only:
+            self._last_full = started.date()
+        self.coverage = {
+            "started": started.isoformat(timespec="seconds"),
+            "kind": "refresh" if open_only else "full",
+            "duration_s": round((datetime.now() - started).total_seconds(), 1),
+            "targets": len(targets),
+            "warmed": len(targets) - len(failed),
+            "failed": failed,
+        }
+        return self.coverage
+
+    def coverage_report(self) -> Dict[str, Any]:
+        """Last run plus how many targets the store can serve right now."""
+        store = self.store_factory()
+        targets = warm_targets(self.shop_ids)
+        servable = sum(store.is_fresh(slice_key("shops", p, ids, WARM_OUTPUTS)) for p, ids in targets)
+        return {
+            **self.coverage,
+            "servable": servable,
+            "coverage": servable / len(targets) if targets else 1.0,
+        }
+
+    def _refresh_interval_s(self) -> float:
+        # Ruim vóór het verlopen van open periodes in de store verversen
+        return max(_MIN_REFRESH_S, self.store_factory().open_ttl_s * 0.8)
+
+    def _due(self, now: datetime) -> Optional[str]:
+        """'full', 'refresh' or None for the current moment."""
+        if now < _at(now, self.warm_at):
+            return None
+        if self._last_full != now.date():
+            return "full"
+        if now <= _at(now, self.refresh_until) and self._last_run is not None:
+            if (now - self._last_run).total_seconds() >= self._refresh_interval_s():
+                return "refresh"
+        return None
+
+    def _seconds_to_next(self, now: datetime) -> float:
+        wake = _next_run(now, self.warm_at)
+        if self._last_run is not None and _at(now, self.warm_at) <= now <= _at(now, self.refresh_until):
+            wake = min(wake, self._last_run + timedelta(seconds=self._refresh_interval_s()))
+        return max((wake - now).total_seconds(), 1.0)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            due = self._due(datetime.now())
+            if due:
+                try:
+                    self.warm_now(open_only=due == "refresh")
+                except Exception as e:
+                    # De thread moet blijven lopen; fout zichtbaar maken in de coverage
+                    self.coverage = {"started": datetime.now().isoformat(timespec="seconds"), "error": str(e)}
+                    self._last_run = datetime.now()
+                    if due == "full":
+                        self._last_full = self._last_run.date()
+            if self._stop.wait(timeout=self._seconds_to_next(datetime.now())):
+                break
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="pfm-cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+@st.cache_resource(show_spinner=False)
+def start_cache_warmer() -> CacheWarmer:
+    # Eén scheduler per serverproces; instellingen via secrets
+    global _active
+    warmer = CacheWarmer(
+        get_kpi_store,
+        list(SHOP_NAME_MAP.keys()),
+        warm_at=str(st.secrets.get("WARMUP_AT", _DEFAULT_WARM_AT)),
+        refresh_until=str(st.secrets.get("WARMUP_REFRESH_UNTIL", _DEFAULT_REFRESH_UNTIL)),
+        concurrency=int(st.secrets.get("WARMUP_CONCURRENCY", _DEFAULT_CONCURRENCY)),
+        spread_s=float(st.secrets.get("WARMUP_SPREAD_S", _DEFAULT_SPREAD_S)),
+    )
+    # Na "Clear cache" wordt deze functie opnieuw uitgevoerd; stop dan de vorige thread
+    with _active_lock:
+        if _active is not None:
+            _active.stop(timeout=0)
+        _active = warmer
+    warmer.start()
+    return warmer
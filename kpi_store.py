@@ -0,0 +1,283 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Optional, List, Tuple, Dict, Any, Callable
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Sleutel van één periode-slice: (as_of, source, period, period_step, shop_ids, outputs).
+# as_of is de datum waarop de relatieve periode ("yesterday", ...) is opgevraagd.
+SliceKey = Tuple[str, str, str, str, Tuple[int, ...], Tuple[str, ...]]
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+_DEFAULT_BUDGET_MB = 128
+_DEFAULT_OPEN_TTL_S = 3600
+
+# Periodes die vandaag bevatten en dus gedurende de dag nog veranderen
+OPEN_PERIODS = {"today", "this_week", "this_month", "this_quarter", "this_year"}
+
+# Vaste dtypes, zodat dezelfde KPI in elke slice hetzelfde type heeft
+COUNT_KPIS = {"count_in", "count_out", "inside", "transactions"}
+
+def slice_key(
+    source: str,
+    period: str,
+    data_ids: List[int],
+    outputs: List[str],
+    period_step: str = "day",
+    as_of: Optional[date] = None,
+) -> SliceKey:
+    return (
+        (as_of or date.today()).isoformat(),
+        source,
+        period,
+        period_step,
+        tuple(sorted(int(i) for i in data_ids)),
+        tuple(sorted(outputs)),
+    )
+
+def _date_key(key: Any) -> str:
+    # Periode- en dagkeys kunnen als "date_2026-10-01" binnenkomen
+    return str(key).replace("date_", "")
+
+def report_error(js: Dict[str, Any]) -> Optional[str]:
+    """Error message of a get-report response that did not fail over HTTP, else None."""
+    if isinstance(js, dict) and "_data" in js:
+        js = js["_data"]
+    if not isinstance(js, dict):
+        return "onverwachte response"
+    for k in ("error", "errors", "detail", "message"):
+        if js.get(k) and not isinstance(js.get("data"), dict):
+            return str(js[k])
+    if not isinstance(js.get("data"), dict):
+        return "response zonder 'data'"
+    return None
+
+def report_to_frame(js: Dict[str, Any]) -> pd.DataFrame:
+    """Flatten a get-report response to one row per (shop_id, date)."""
+    if isinstance(js, dict) and "_data" in js:
+        js = js["_data"]
+    data = js.get("data") if isinstance(js, dict) else None
+    rows = []
+    if isinstance(data, dict):
+        for period_key, shops in data.items():
+            if not isinstance(shops, dict):
+                continue
+            for sid, blob in shops.items():
+                if not isinstance(blob, dict):
+                    continue
+                dates = blob.get("dates")
+                if isinstance(dates, dict) and dates:
+                    for d, day in dates.items():
+                        kpis = day.get("data") if isinstance(day, dict) else None
+                        if isinstance(kpis, dict):
+                            rows.append({"shop_id": sid, "date": _date_key(d), **kpis})
+                elif isinstance(blob.get("data"), dict):
+                    rows.append({"shop_id": sid, "date": _date_key(period_key), **blob["data"]})
+    return pd.DataFrame(rows)
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    arr = np.ascontiguousarray(arr)
+    arr.flags.writeable = False
+    return arr
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Array-backed, read-only copy of a day-level KPI frame:
+    shop_id -> category, date -> int32 'day' (days since 1970-01-01),
+    counts -> int32 (int64 if needed, float64 with gaps), other KPIs -> float64.
+    """
+    cols: Dict[str, Any] = {}
+    for col in df.columns:
+        s = df[col]
+        if col == "shop_id":
+            cols["shop_id"] = pd.Categorical(pd.to_numeric(s, errors="coerce").astype("Int32"))
+        elif col == "date":
+            days = pd.to_datetime(s, errors="coerce").to_numpy().astype("datetime64[D]")
+            offsets = np.where(np.isnat(days), -1, (days - _EPOCH).astype(np.int64))
+            cols["day"] = _readonly(offsets.astype(np.int32))
+        else:
+            num = pd.to_numeric(s, errors="coerce")
+            if num.isna().all() and s.notna().any():
+                # Geen KPI-kolom; als categorie bewaren i.p.v. object
+                cols[col] = pd.Categorical(s)
+                continue
+            if col in COUNT_KPIS and num.notna().all() and (num % 1 == 0).all():
+                ints = num.to_numpy(dtype=np.int64)
+                fits = ints.size == 0 or np.iinfo(np.int32).min <= ints.min() <= ints.max() <= np.iinfo(np.int32).max
+                cols[col] = _readonly(ints.astype(np.int32) if fits else ints)
+            else:
+                cols[col] = _readonly(num.to_numpy(dtype=np.float64, na_value=np.nan))
+    # copy=False: geen consolidatie tot één 2D-blok, de read-only arrays blijven gedeeld
+    return pd.DataFrame(cols, copy=False)
+
+def day_to_date(days: pd.Series) -> pd.Series:
+    """Inverse of the int32 'day' column, for display."""
+    return pd.to_datetime(days.where(days >= 0).astype("float64"), unit="D").rename("date")
+
+def to_page_frame(view: pd.DataFrame) -> pd.DataFrame:
+    """
+    Writable copy in the shape the pages used before the store:
+    int shop_id and a datetime 'date' column. Costs a copy per session,
+    so only use it for code that assigns in place.
+    """
+    df = view.copy(deep=True)
+    if "shop_id" in df.columns:
+        df["shop_id"] = df["shop_id"].astype("Int64")
+    if "day" in df.columns:
+        df["date"] = day_to_date(df.pop("day"))
+    return df
+
+class KPIStore:
+    """
+    Process-wide LRU store of compact KPI slices with a memory budget.
+    Eviction works on whole period slices; readers get shallow views
+    that share the underlying (read-only) buffers. Slices of periods that
+    include today expire after open_ttl_s; slices of earlier days are
+    dropped on the next put.
+    """
+
+    def __init__(self, budget_bytes: int, open_ttl_s: float = _DEFAULT_OPEN_TTL_S):
+        self.budget_bytes = int(budget_bytes)
+        self.open_ttl_s = float(open_ttl_s)
+        self._slices: "OrderedDict[SliceKey, pd.DataFrame]" = OrderedDict()
+        self._sizes: Dict[SliceKey, int] = {}
+        self._stored_at: Dict[SliceKey, float] = {}
+        self._loading: Dict[SliceKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def __contains__(self, key: SliceKey) -> bool:
+        return key in self._slices
+
+    def _drop(self, key: SliceKey) -> None:
+        del self._slices[key]
+        del self._sizes[key]
+        del self._stored_at[key]
+
+    def _expired(self, key: SliceKey) -> bool:
+        if key[0] != date.today().isoformat():
+            return True
+        return key[2] in OPEN_PERIODS and time.monotonic() - self._stored_at[key] > self.open_ttl_s
+
+    def is_fresh(self, key: SliceKey) -> bool:
+        """True if get(key) would hit; does not touch LRU order or stats."""
+        with self._lock:
+            return key in self._slices and not self._expired(key)
+
+    def get(self, key: SliceKey) -> Optional[pd.DataFrame]:
+        with self._lock:
+            frame = self._slices.get(key)
+            if frame is not None and self._expired(key):
+                self._drop(key)
+                frame = None
+            if frame is None:
+                self.misses += 1
+                return None
+            self._slices.move_to_end(key)
+            self.hits += 1
+        return frame.copy(deep=False)
+
+    def put(self, key: SliceKey, df: pd.DataFrame) -> pd.DataFrame:
+        frame = compact_frame(df)
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            if key in self._slices:
+                self._drop(key)
+            for old in [k for k in self._slices if k[0] != key[0]]:
+                self._drop(old)
+            # Lege (fout)responses en slices groter dan het hele budget worden niet bewaard
+            if not frame.empty and size <= self.budget_bytes:
+                self._slices[key] = frame
+                self._sizes[key] = size
+                self._stored_at[key] = time.monotonic()
+                while self.used_bytes > self.budget_bytes:
+                    self._drop(next(iter(self._slices)))
+                    self.evictions += 1
+        return frame.copy(deep=False)
+
+    def get_or_load(self, key: SliceKey, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        frame = self.get(key)
+        if frame is not None:
+            return frame
+        # Single-flight: gelijktijdige misses op dezelfde key doen één backend-call
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._slices and not self._expired(key):
+                    self._slices.move_to_end(key)
+                    return self._slices[key].copy(deep=False)
+            try:
+                return self.put(key, loader())
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slices.clear()
+            self._sizes.clear()
+            self._stored_at.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slices": len(self._slices),
+                "used_mb": round(self.used_bytes / 2**20, 2),
+                "budget_mb": round(self.budget_bytes / 2**20, 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+@st.cache_resource
+def get_kpi_store() -> KPIStore:
+    # Eén store per serverproces, gedeeld door alle sessies
+    budget_mb = float(st.secrets.get("KPI_STORE_BUDGET_MB", _DEFAULT_BUDGET_MB))
+    open_ttl_s = float(st.secrets.get("KPI_STORE_OPEN_TTL_S", _DEFAULT_OPEN_TTL_S))
+    return KPIStore(int(budget_mb * 2**20), open_ttl_s=open_ttl_s)
+
+def fetch_report_frame(
+    source: str,
+    period: str,
+    data_ids: List[int],
+    outputs: List[str],
+    period_step: str = "day",
+    timeout: int = 90,
+) -> pd.DataFrame:
+    """Fetch one report as a day-level frame; raises ValueError on an error payload."""
+    # Lazy import: utils_pfmx leest st.secrets en is niet nodig voor de store zelf
+    from utils_pfmx import api_get_report
+    js = api_get_report(source, period, data_ids, outputs, period_step=period_step, timeout=timeout)
+    err = report_error(js)
+    if err:
+        raise ValueError(f"{period}: {err}")
+    return report_to_frame(js)
+
+def get_report_frame(
+    source: str,
+    period: str,
+    data_ids: List[int],
+    outputs: List[str],
+    period_step: str = "day",
+    timeout: int = 90,
+) -> pd.DataFrame:
+    """
+    Day-level KPI frame from the shared store; fetches the report on a miss.
+    The result is a read-only view; use to_page_frame() before assigning in place.
+    """
+    key = slice_key(source, period, data_ids, outputs, period_step)
+    return get_kpi_store().get_or_load(
+        key,
+        lambda: fetch_report_frame(source, period, data_ids, outputs, period_step, timeout),
+    )
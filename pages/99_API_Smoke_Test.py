@@ -1,6 +1,8 @@
 import streamlit as st
 from shop_mapping import SHOP_NAME_MAP
 from utils_pfmx import api_get_report, api_get_live_inside
+from cache_warmer import start_cache_warmer
+from kpi_store import get_kpi_store
 
 st.set_page_config(page_title="API Smoke Test", page_icon="🧪", layout="wide")
 st.title("🧪 API Smoke Test – Primary & Fallback Always Compared")
@@ -35,4 +37,9 @@ for variant in ["primary","fallback"]:
     st.markdown(f"**Variant:** {res['_variant']}")
     st.code(res["_url"])
     with st.expander(f"Bekijk JSON – {res['_variant']}"):
-        st.json(res["_data"])
\ No newline at end of file
+        st.json(res["_data"])
+
+# --- CACHE WARM-UP ---
+st.subheader("3️⃣ cache warm-up (KPI-store)")
+st.json(start_cache_warmer().coverage_report())
+st.json(get_kpi_store().stats())
@@ -0,0 +1,133 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_warmer
+import kpi_store
+from cache_warmer import CacheWarmer, WARM_OUTPUTS, _next_run, warm_targets
+from kpi_store import KPIStore, slice_key
+
+# Zelfde lijst (andere volgorde) als pages/01_Store_Live_Ops.py
+PAGE_OUTPUTS = ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]
+
+def _frame(ids):
+    return pd.DataFrame({"shop_id": ids, "date": ["2026-10-18"] * len(ids), "count_in": [5] * len(ids)})
+
+@pytest.fixture
+def fetched(monkeypatch):
+    calls = []
+
+    def fake(source, period, ids, outputs, period_step="day", timeout=90):
+        calls.append((period, tuple(ids)))
+        return _frame(ids)
+
+    monkeypatch.setattr(cache_warmer, "fetch_report_frame", fake)
+    return calls
+
+def _warmer(store, shop_ids=(1, 2), **kw):
+    kw.setdefault("spread_s", 0)
+    return CacheWarmer(lambda: store, list(shop_ids), **kw)
+
+def test_warm_targets_follow_store_live_ops():
+    assert warm_targets([1, 2]) == [
+        ("yesterday", [1]), ("yesterday", [2]),
+        ("this_week", [1]), ("this_week", [2]),
+        ("last_week", [1]), ("last_week", [2]),
+    ]
+
+def test_warmed_keys_hit_get_report_frame(monkeypatch, fetched):
+    store = KPIStore(2**20)
+    _warmer(store).warm_now()
+
+    def no_fetch(*args, **kwargs):
+        raise AssertionError("cold backend call")
+
+    monkeypatch.setattr(kpi_store, "get_kpi_store", lambda: store)
+    monkeypatch.setattr(kpi_store, "fetch_report_frame", no_fetch)
+    for period in ("yesterday", "this_week", "last_week"):
+        assert not kpi_store.get_report_frame("shops", period, [1], PAGE_OUTPUTS[::-1]).empty
+
+def test_next_run_before_and_after_warm_at():
+    before = datetime(2026, 10, 19, 5, 0)
+    after = datetime(2026, 10, 19, 7, 0)
+    assert _next_run(before, "06:30") == datetime(2026, 10, 19, 6, 30)
+    assert _next_run(after, "06:30") == datetime(2026, 10, 20, 6, 30)
+
+def test_invalid_warm_at_rejected_up_front():
+    with pytest.raises(ValueError):
+        _warmer(KPIStore(2**20), warm_at="6.30")
+
+def test_concurrency_cap(monkeypatch):
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def slow(source, period, ids, outputs, period_step="day", timeout=90):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return _frame(ids)
+
+    monkeypatch.setattr(cache_warmer, "fetch_report_frame", slow)
+    _warmer(KPIStore(2**20), shop_ids=range(1, 7), concurrency=2).warm_now()
+    assert peak[0] == 2
+
+def test_coverage_records_empty_and_raising_fetches(monkeypatch):
+    def flaky(source, period, ids, outputs, period_step="day", timeout=90):
+        if period == "last_week":
+            return pd.DataFrame()
+        if period == "this_week" and ids == [2]:
+            raise ValueError("this_week: invalid period")
+        return _frame(ids)
+
+    monkeypatch.setattr(cache_warmer, "fetch_report_frame", flaky)
+    store = KPIStore(2**20)
+    warmer = _warmer(store)
+    cov = warmer.warm_now()
+    assert cov["targets"] == 6 and cov["warmed"] == 3
+    errors = sorted(f["error"] for f in cov["failed"])
+    assert errors == ["lege response", "lege response", "this_week: invalid period"]
+    report = warmer.coverage_report()
+    assert report["servable"] == 3 and report["coverage"] == 0.5
+
+def test_coverage_report_drops_expired_open_periods(fetched):
+    store = KPIStore(2**20, open_ttl_s=0.01)
+    warmer = _warmer(store)
+    warmer.warm_now()
+    time.sleep(0.02)
+    assert warmer.coverage_report()["servable"] == 4  # this_week is verlopen
+    warmer.warm_now(open_only=True)
+    assert warmer.coverage["targets"] == 2
+    assert warmer.coverage_report()["servable"] == 6
+
+def test_refresh_due_in_morning_window(fetched):
+    store = KPIStore(2**20, open_ttl_s=600)
+    warmer = _warmer(store, warm_at="06:30", refresh_until="11:00")
+    now = datetime.now().replace(hour=8, minute=0)
+    assert warmer._due(now.replace(hour=6, minute=0)) is None
+    assert warmer._due(now) == "full"
+    warmer._last_full, warmer._last_run = now.date(), now
+    assert warmer._due(now + timedelta(seconds=400)) is None
+    assert warmer._due(now + timedelta(seconds=500)) == "refresh"
+    assert warmer._due(now.replace(hour=12)) is None
+    assert warmer._seconds_to_next(now) == pytest.approx(480)
+
+def test_start_and_stop(fetched):
+    store = KPIStore(2**20)
+    warmer = _warmer(store, warm_at="00:00", refresh_until="23:59")
+    warmer.start()
+    deadline = time.monotonic() + 2
+    while not warmer.coverage and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert warmer.coverage["warmed"] == 6
+    warmer.stop(timeout=2)
+    assert not warmer._thread.is_alive()
@@ -0,0 +1,128 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kpi_store import KPIStore, compact_frame, report_error, report_to_frame, slice_key, to_page_frame
+
+OUTPUTS = ["count_in", "conversion_rate", "turnover", "sales_per_visitor"]
+
+def _day_frame(shop_id: int, n_days: int = 7) -> pd.DataFrame:
+    dates = pd.date_range("2026-10-01", periods=n_days).strftime("%Y-%m-%d")
+    return pd.DataFrame({
+        "shop_id": [str(shop_id)] * n_days,
+        "date": dates,
+        "count_in": [100 + i for i in range(n_days)],
+        "conversion_rate": [0.2] * n_days,
+        "turnover": [1234.5] * n_days,
+        "sales_per_visitor": [12.3] * n_days,
+    })
+
+def _slice_size(df: pd.DataFrame) -> int:
+    return int(compact_frame(df).memory_usage(index=True, deep=True).sum())
+
+def test_compact_frame_dtypes():
+    frame = compact_frame(_day_frame(32224))
+    assert isinstance(frame["shop_id"].dtype, pd.CategoricalDtype)
+    assert frame["day"].dtype == np.int32
+    assert frame["count_in"].dtype == np.int32
+    assert frame["turnover"].dtype == np.float64
+    assert frame["conversion_rate"].dtype == np.float64
+    assert "date" not in frame.columns
+
+def test_slice_key_ignores_output_and_shop_order():
+    assert slice_key("shops", "yesterday", [2, 1], OUTPUTS) == slice_key("shops", "yesterday", [1, 2], OUTPUTS[::-1])
+
+def test_lru_eviction_order_and_budget():
+    size = _slice_size(_day_frame(1))
+    store = KPIStore(budget_bytes=size * 2)
+    k1, k2, k3 = (slice_key("shops", "last_week", [i], OUTPUTS) for i in (1, 2, 3))
+    store.put(k1, _day_frame(1))
+    store.put(k2, _day_frame(2))
+    assert store.get(k1) is not None  # k1 wordt recent gebruikt, k2 is nu de oudste
+    store.put(k3, _day_frame(3))
+    assert k2 not in store
+    assert k1 in store and k3 in store
+    assert store.used_bytes <= store.budget_bytes
+    assert store.evictions == 1
+
+def test_oversize_slice_not_stored():
+    store = KPIStore(budget_bytes=_slice_size(_day_frame(1)) - 1)
+    key = slice_key("shops", "last_week", [1], OUTPUTS)
+    frame = store.put(key, _day_frame(1))
+    assert not frame.empty
+    assert key not in store
+    assert store.used_bytes == 0
+
+def test_empty_result_not_stored():
+    store = KPIStore(budget_bytes=2**20)
+    key = slice_key("shops", "yesterday", [1], OUTPUTS)
+    assert store.get_or_load(key, pd.DataFrame).empty
+    assert key not in store
+
+def test_views_share_read_only_buffers():
+    store = KPIStore(budget_bytes=2**20)
+    key = slice_key("shops", "last_week", [1], OUTPUTS)
+    store.put(key, _day_frame(1))
+    a, b = store.get(key), store.get(key)
+    assert np.shares_memory(a["turnover"].to_numpy(), b["turnover"].to_numpy())
+    # De blokken van de slice zelf moeten read-only zijn, los van Copy-on-Write
+    blocks = [blk.values for blk in store._slices[key]._mgr.blocks if isinstance(blk.values, np.ndarray)]
+    assert blocks and all(not v.flags.writeable for v in blocks)
+    # Een kolom toevoegen aan een view raakt de gedeelde slice niet
+    a["extra"] = 1
+    assert "extra" not in store.get(key).columns
+
+def test_to_page_frame_is_writable_with_dates():
+    store = KPIStore(budget_bytes=2**20)
+    key = slice_key("shops", "last_week", [1], OUTPUTS)
+    store.put(key, _day_frame(1))
+    df = to_page_frame(store.get(key))
+    df.loc[0, "turnover"] = 0.0
+    assert df["date"].iloc[0] == pd.Timestamp("2026-10-01")
+    assert store.get(key)["turnover"].iloc[0] == 1234.5
+
+def test_stale_day_and_open_period_expire():
+    store = KPIStore(budget_bytes=2**20, open_ttl_s=0.01)
+    old = ("2000-01-01",) + slice_key("shops", "yesterday", [1], OUTPUTS)[1:]
+    store.put(old, _day_frame(1))
+    assert store.get(old) is None
+    open_key = slice_key("shops", "this_week", [1], OUTPUTS)
+    store.put(open_key, _day_frame(1))
+    time.sleep(0.02)
+    assert store.get(open_key) is None
+
+def test_concurrent_misses_load_once():
+    store = KPIStore(budget_bytes=2**20)
+    key = slice_key("shops", "yesterday", [1], OUTPUTS)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return _day_frame(1)
+
+    threads = [threading.Thread(target=store.get_or_load, args=(key, loader)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+def test_report_to_frame_strips_date_prefix_on_day_keys():
+    js = {"data": {"date_2026-10-01": {"32224": {"dates": {
+        "date_2026-10-01": {"data": {"count_in": 10}},
+        "date_2026-10-02": {"data": {"count_in": 12}},
+    }}}}}
+    frame = compact_frame(report_to_frame(js))
+    assert (frame["day"] >= 0).all()
+    assert report_error(js) is None
+
+def test_report_error_detects_error_payload():
+    assert report_error({"_data": {"error": "invalid period"}}) == "invalid period"
+    assert report_error({"status": "ok"}) is not None